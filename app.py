@@ -1,11 +1,37 @@
 # app.py - Admin Orders Management Application
 import os
 import sys
-from datetime import datetime, timedelta
+import time
+import hmac
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime
+from decimal import Decimal
 from functools import wraps
-import traceback
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
 
+from config import ist_now, format_ist_datetime
+from utils import format_currency
+
+# Error logging goes through a queue so request threads never block on
+# stderr I/O; a background listener does the actual writing/flushing.
+# logger.exception also records the traceback, replacing the old
+# print + traceback.print_exc pairs on error paths.
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, logging.StreamHandler()
+)
+_log_listener.start()
+
+logger = logging.getLogger('admin')
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+
 # Flask App Setup
 app = Flask(__name__, 
     template_folder='templates',
@@ -15,370 +41,850 @@ app = Flask(__name__,
 
 app.secret_key = os.environ.get('ADMIN_SECRET_KEY', 'dev-secret-key-123')
 
+# orjson serializes the big nested order payloads (datetimes, Decimals)
+# several times faster than stdlib json; fall back silently when the
+# wheel isn't installed
+try:
+    import orjson
+    from flask.json.provider import JSONProvider
+
+    class OrjsonProvider(JSONProvider):
+        """Flask JSON provider backed by orjson"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(
+                obj,
+                default=str,
+                option=orjson.OPT_NAIVE_UTC
+            ).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            # Flask's session serializer passes object_hook to restore
+            # tagged values (tuples, flashed messages); orjson has no
+            # hook support, so those calls delegate to stdlib json
+            if kwargs:
+                return json.loads(s, **kwargs)
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+except ImportError:
+    print("⚠️ orjson not installed, using default JSON provider")
+
+# Admin credentials, read once at import instead of per login POST.
+# ADMIN_PASSWORD_HASH (a werkzeug generate_password_hash value) takes
+# precedence so the plaintext ADMIN_PASSWORD can be dropped from the env.
+ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
+ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
+ADMIN_PASSWORD_HASH = os.environ.get('ADMIN_PASSWORD_HASH')
+
+def _check_admin_credentials(username, password):
+    """Constant-time credential check"""
+    # compare bytes: compare_digest rejects non-ASCII str input
+    username_ok = hmac.compare_digest(
+        username.encode('utf-8'), ADMIN_USERNAME.encode('utf-8'))
+    if ADMIN_PASSWORD_HASH:
+        from werkzeug.security import check_password_hash
+        password_ok = check_password_hash(ADMIN_PASSWORD_HASH, password)
+    else:
+        password_ok = hmac.compare_digest(
+            password.encode('utf-8'), ADMIN_PASSWORD.encode('utf-8'))
+    return username_ok and password_ok
+
 # ============================================
 # ✅ DATABASE CONNECTION
 # ============================================
 
-def get_db_connection():
-    """Establish database connection"""
+# A single pool per worker: connections are reused across requests
+# instead of paying the TCP + TLS + auth handshake on every page view
+_db_pool = None
+
+def get_db_pool():
+    """Create (once) and return the shared connection pool"""
+    global _db_pool
+
+    if _db_pool is not None:
+        return _db_pool
+
     try:
-        import psycopg
+        import psycopg_pool
         from psycopg.rows import dict_row
-        
+
         database_url = os.environ.get('DATABASE_URL')
-        
+
         if not database_url:
             print("⚠️ DATABASE_URL not found")
             return None
-        
+
         # Fix for Render's postgres:// URL
         if database_url.startswith('postgres://'):
             database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        
-        conn = psycopg.connect(database_url, row_factory=dict_row)
-        print("✅ Database connected successfully!")
-        return conn
-        
+
+        _db_pool = psycopg_pool.ConnectionPool(
+            database_url,
+            min_size=int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            max_size=int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            kwargs={'row_factory': dict_row}
+        )
+        print("✅ Database connection pool ready!")
+        return _db_pool
+
     except Exception as e:
-        print(f"❌ Database connection error: {e}")
+        logger.exception("Database pool error")
         return None
 
+def get_db_connection():
+    """Check out a pooled connection as a context manager.
+
+    Returns None when the pool is unavailable; otherwise use as
+    `with get_db_connection() as conn:` so checkout/return and
+    rollback-on-exception are automatic.
+    """
+    pool = get_db_pool()
+
+    if not pool:
+        return None
+
+    return pool.connection()
+
 # ============================================
-# ✅ HELPER FUNCTIONS
+# ✅ REDIS CACHE
 # ============================================
 
-def ist_now():
-    return datetime.now()
+# Short-TTL cache for stats that are recomputed on every template render;
+# the app works without Redis (cache calls just fall through)
+try:
+    import redis
+    _redis_client = redis.Redis.from_url(
+        os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+        socket_connect_timeout=1,
+        socket_timeout=1,
+        decode_responses=True
+    )
+except Exception as e:
+    logger.warning("Redis unavailable, stats caching disabled: %s", e)
+    _redis_client = None
 
-def format_ist_datetime(dt, fmt="%d %b %Y, %I:%M %p"):
-    if not dt:
-        return ""
-    if isinstance(dt, str):
-        try:
-            dt = datetime.strptime(dt, '%Y-%m-%d %H:%M:%S')
-        except:
-            return dt
-    try:
-        return dt.strftime(fmt)
-    except:
-        return str(dt)
+def _cache_default(obj):
+    """JSON fallback for cached values: keep numbers numeric.
+
+    Decimals must come back as floats, not strings — templates do
+    arithmetic on cached stats (e.g. revenue / quantity).
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return str(obj)
 
-def format_currency(amount):
+def cached(key, ttl=60):
+    """Cache a function's JSON-serializable result in Redis for ttl seconds.
+
+    Positional args are appended to the key (e.g. order_stats:today).
+    On any Redis error the wrapped function just runs uncached.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            cache_key = key
+            if args:
+                cache_key += ':' + ':'.join(str(a) for a in args)
+
+            if _redis_client:
+                try:
+                    hit = _redis_client.get(cache_key)
+                    if hit is not None:
+                        return json.loads(hit)
+                except Exception:
+                    pass
+
+            result = f(*args, **kwargs)
+
+            if _redis_client and result is not None:
+                try:
+                    _redis_client.setex(cache_key, ttl, json.dumps(result, default=_cache_default))
+                except Exception:
+                    pass
+
+            return result
+        return wrapper
+    return decorator
+
+def invalidate_stats_cache():
+    """Drop cached stats; call from order write paths"""
+    if not _redis_client:
+        return
     try:
-        if amount is None:
-            return "₹0.00"
-        amount_float = float(amount)
-        return f"₹{amount_float:,.2f}"
-    except:
-        return "₹0.00"
+        keys = ['admin_stats']
+        keys += [f'order_stats:{p}' for p in ('today', 'week', 'month', 'all')]
+        _redis_client.delete(*keys)
+    except Exception:
+        pass
+
+# ============================================
+# ✅ HELPER FUNCTIONS
+# ============================================
+
+# ist_now / format_ist_datetime / format_currency used to have local
+# near-copies here; config.py and utils.py are the canonical versions
+
+# Expose the formatters as Jinja filters so templates format rows as
+# they render instead of routes pre-building *_formatted keys per row
+app.jinja_env.filters['currency'] = format_currency
+app.jinja_env.filters['istdt'] = format_ist_datetime
+
+# And as template globals, so routes don't pass them as kwargs on
+# every render_template call
+app.jinja_env.globals.update(
+    ist_now=ist_now,
+    format_ist_datetime=format_ist_datetime,
+    format_currency=format_currency)
 
 # ============================================
 # ✅ DATABASE FUNCTIONS
 # ============================================
 
+def _is_word_search(search):
+    """True when a search term can use the full-text index.
+
+    Plain alphanumeric words hit the GIN tsvector index via a
+    prefix-matching tsquery (see _tsquery_prefix); anything with
+    special characters (or too short to be selective) falls back to
+    trigram-backed ILIKE so mid-string matches keep working. Digit-only
+    terms also stay on ILIKE: they are usually phone or order-id
+    fragments, where a prefix match is not enough.
+    """
+    compact = search.replace(' ', '')
+    return len(search) >= 3 and compact.isalnum() and not compact.isdigit()
+
+def _tsquery_prefix(search):
+    """Build a prefix-matching tsquery string from a word search.
+
+    'rah ku' becomes 'rah:* & ku:*', so partial names match the way
+    ILIKE did (plainto_tsquery only matches whole tokens and silently
+    returned nothing for fragments like 'Rah'). Safe to hand to
+    to_tsquery because _is_word_search only admits space-separated
+    alphanumeric tokens.
+    """
+    return ' & '.join(w + ':*' for w in search.split())
+
 def get_todays_orders():
     """Get today's orders from database"""
     try:
-        conn = get_db_connection()
-        if not conn:
+        conn_ctx = get_db_connection()
+        if not conn_ctx:
             return []
-        
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT 
-                    o.order_id,
-                    o.user_name,
-                    o.user_phone,
-                    o.total_amount,
-                    o.status,
-                    o.order_date,
-                    COUNT(oi.order_item_id) as item_count
-                FROM orders o
-                LEFT JOIN order_items oi ON o.order_id = oi.order_id
-                WHERE DATE(o.order_date) = CURRENT_DATE
-                GROUP BY o.order_id
-                ORDER BY o.order_date DESC
-                LIMIT 20
-            """)
-            orders = cur.fetchall()
-        
-        conn.close()
+
+        with conn_ctx as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT
+                        o.order_id,
+                        o.user_name,
+                        o.user_phone,
+                        o.total_amount,
+                        o.status,
+                        o.order_date,
+                        COUNT(oi.order_item_id) as item_count
+                    FROM orders o
+                    LEFT JOIN order_items oi ON o.order_id = oi.order_id
+                    WHERE o.order_date >= CURRENT_DATE
+                      AND o.order_date < CURRENT_DATE + INTERVAL '1 day'
+                    GROUP BY o.order_id
+                    ORDER BY o.order_date DESC
+                    LIMIT 20
+                """, prepare=True, binary=True)
+                orders = cur.fetchall()
+
         return orders
-        
+
     except Exception as e:
-        print(f"❌ Error getting today's orders: {e}")
+        logger.exception("Error getting today's orders")
         return []
 
+@cached('orders_count', ttl=30)
+def _count_orders(status='', search=''):
+    """Total for the orders pagination header.
+
+    The exact COUNT over an ILIKE-filtered set can cost as much as the
+    page query itself, so results are cached for 30s; the unfiltered
+    total comes from the planner's reltuples estimate, which is free.
+    """
+    conn_ctx = get_db_connection()
+    if not conn_ctx:
+        return 0
+
+    with conn_ctx as conn:
+        with conn.cursor() as cur:
+            if not status and not search:
+                cur.execute("""
+                    SELECT GREATEST(reltuples, 0)::bigint as total
+                    FROM pg_class WHERE relname = 'orders'
+                """)
+                row = cur.fetchone()
+                return row['total'] if row else 0
+
+            count_query = "SELECT COUNT(*) as total FROM orders o"
+            conditions = []
+            params = []
+
+            if status:
+                conditions.append("o.status = %s")
+                params.append(status)
+
+            if search:
+                if _is_word_search(search):
+                    conditions.append("o.search_tsv @@ to_tsquery('simple', %s)")
+                    params.append(_tsquery_prefix(search))
+                else:
+                    conditions.append("""
+                        (o.user_name ILIKE %s OR 
+                         o.user_phone ILIKE %s OR 
+                         o.user_email ILIKE %s OR 
+                         CAST(o.order_id AS TEXT) ILIKE %s)
+                    """)
+                    search_param = f"%{search}%"
+                    params.extend([search_param, search_param, search_param, search_param])
+
+            count_query += " WHERE " + " AND ".join(conditions)
+            cur.execute(count_query, params)
+            return cur.fetchone()['total']
+
+@cached('customers_count', ttl=30)
+def _count_customers(search=''):
+    """Total for the customers pagination header (cached, see _count_orders)"""
+    conn_ctx = get_db_connection()
+    if not conn_ctx:
+        return 0
+
+    with conn_ctx as conn:
+        with conn.cursor() as cur:
+            if not search:
+                cur.execute("""
+                    SELECT GREATEST(reltuples, 0)::bigint as total
+                    FROM pg_class WHERE relname = 'users'
+                """)
+                row = cur.fetchone()
+                return row['total'] if row else 0
+
+            cur.execute("""
+                SELECT COUNT(*) as total FROM users u
+                WHERE (u.full_name ILIKE %s OR 
+                       u.phone ILIKE %s OR 
+                       u.email ILIKE %s)
+            """, (f"%{search}%", f"%{search}%", f"%{search}%"))
+            return cur.fetchone()['total']
+
+# SQL for the list pages, fully composed at import time: one template
+# per (status-filter?, search-mode) combination so the request path
+# just picks one by key instead of joining condition strings per call
+_ORDERS_LIST_SELECT = """
+    SELECT 
+        o.order_id,
+        o.user_name,
+        o.user_phone,
+        o.user_email,
+        o.total_amount,
+        o.payment_mode,
+        o.delivery_location,
+        o.status,
+        o.order_date,
+        COUNT(oi.order_item_id) as item_count
+    FROM orders o
+    LEFT JOIN order_items oi ON o.order_id = oi.order_id
+"""
+_ORDERS_STATUS_COND = "o.status = %s"
+_ORDERS_TSV_COND = "o.search_tsv @@ to_tsquery('simple', %s)"
+_ORDERS_ILIKE_COND = """
+    (o.user_name ILIKE %s OR 
+     o.user_phone ILIKE %s OR 
+     o.user_email ILIKE %s OR 
+     CAST(o.order_id AS TEXT) ILIKE %s)
+"""
+_ORDERS_LIST_TAIL = """
+    GROUP BY o.order_id
+    ORDER BY o.order_date DESC
+    LIMIT %s OFFSET %s
+"""
+
+def _build_list_queries(select, tail, status_cond, search_conds):
+    """Compose the WHERE variants of a list query up front."""
+    queries = {}
+    for has_status in ((False, True) if status_cond else (False,)):
+        for mode in (None,) + tuple(search_conds):
+            conditions = []
+            if has_status:
+                conditions.append(status_cond)
+            if mode:
+                conditions.append(search_conds[mode])
+            query = select
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            key = (has_status, mode) if status_cond else mode
+            queries[key] = query + tail
+    return queries
+
+_ORDERS_LIST_QUERIES = _build_list_queries(
+    _ORDERS_LIST_SELECT, _ORDERS_LIST_TAIL, _ORDERS_STATUS_COND,
+    {'tsv': _ORDERS_TSV_COND, 'ilike': _ORDERS_ILIKE_COND}
+)
+
+_CUSTOMERS_LIST_SELECT = """
+    SELECT 
+        u.id,
+        u.full_name,
+        u.phone,
+        u.email,
+        u.profile_pic,
+        u.city,
+        u.state,
+        u.is_active,
+        u.created_at,
+        u.total_orders,
+        u.total_spent,
+        u.last_order_date
+    FROM users u
+"""
+_CUSTOMERS_ILIKE_COND = """
+    (u.full_name ILIKE %s OR 
+     u.phone ILIKE %s OR 
+     u.email ILIKE %s)
+"""
+_CUSTOMERS_LIST_TAIL = """
+    ORDER BY u.created_at DESC
+    LIMIT %s OFFSET %s
+"""
+
+_CUSTOMERS_LIST_QUERIES = _build_list_queries(
+    _CUSTOMERS_LIST_SELECT, _CUSTOMERS_LIST_TAIL, None,
+    {'ilike': _CUSTOMERS_ILIKE_COND}
+)
+
 def get_all_orders(page=1, per_page=20, status=None, search=None):
     """Get all orders with pagination"""
     try:
-        conn = get_db_connection()
-        if not conn:
+        conn_ctx = get_db_connection()
+        if not conn_ctx:
             return [], 0
-        
+
         offset = (page - 1) * per_page
-        
-        query = """
-            SELECT 
-                o.order_id,
-                o.user_name,
-                o.user_phone,
-                o.user_email,
-                o.total_amount,
-                o.payment_mode,
-                o.delivery_location,
-                o.status,
-                o.order_date,
-                COUNT(oi.order_item_id) as item_count
-            FROM orders o
-            LEFT JOIN order_items oi ON o.order_id = oi.order_id
-        """
-        
-        conditions = []
+
         params = []
-        
+        search_mode = None
+
         if status:
-            conditions.append("o.status = %s")
             params.append(status)
-        
+
         if search:
-            conditions.append("""
-                (o.user_name ILIKE %s OR 
-                 o.user_phone ILIKE %s OR 
-                 o.user_email ILIKE %s OR 
-                 CAST(o.order_id AS TEXT) ILIKE %s)
-            """)
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param, search_param])
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += """
-            GROUP BY o.order_id
-            ORDER BY o.order_date DESC
-            LIMIT %s OFFSET %s
-        """
-        
-        params.extend([per_page, offset])
-        
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            orders = cur.fetchall()
-            
-            # Get total count
-            count_query = "SELECT COUNT(*) as total FROM orders"
-            if conditions:
-                count_query += " WHERE " + " AND ".join(conditions)
-                cur.execute(count_query, params[:-2])
+            if _is_word_search(search):
+                search_mode = 'tsv'
+                params.append(_tsquery_prefix(search))
             else:
-                cur.execute(count_query)
-            
-            total = cur.fetchone()['total']
-        
-        conn.close()
+                search_mode = 'ilike'
+                search_param = f"%{search}%"
+                params.extend([search_param, search_param, search_param, search_param])
+
+        query = _ORDERS_LIST_QUERIES[(bool(status), search_mode)]
+        params.extend([per_page, offset])
+
+        with conn_ctx as conn:
+            # Named cursor: rows stream from the server in itersize batches
+            # instead of the whole result buffering client-side, so large
+            # per_page values (export paths) keep memory bounded
+            with conn.cursor(name='orders_stream') as cur:
+                cur.itersize = 200
+                cur.execute(query, params)
+                orders = list(islice(cur, per_page))
+
+        total = _count_orders(status or '', search or '')
+
         return orders, total
-        
+
     except Exception as e:
-        print(f"❌ Error getting all orders: {e}")
+        logger.exception("Error getting all orders")
         return [], 0
 
 def get_order_details(order_id):
     """Get complete order details"""
     try:
-        conn = get_db_connection()
-        if not conn:
+        conn_ctx = get_db_connection()
+        if not conn_ctx:
             return None
-        
-        with conn.cursor() as cur:
-            # Get order basic info
-            cur.execute("SELECT * FROM orders WHERE order_id = %s", (order_id,))
-            order = cur.fetchone()
-            
-            if not order:
-                conn.close()
-                return None
-            
-            # Get order items
-            cur.execute("""
-                SELECT * FROM order_items 
-                WHERE order_id = %s 
-                ORDER BY order_item_id
-            """, (order_id,))
-            items = cur.fetchall()
-            
-            # Get customer details
-            if order.get('user_id'):
-                cur.execute("""
-                    SELECT * FROM users 
-                    WHERE id = %s 
-                    LIMIT 1
-                """, (order['user_id'],))
-                customer = cur.fetchone()
-                
-                # Get addresses
+
+        with conn_ctx as conn:
+            with conn.cursor() as cur:
+                # One round-trip: the items, customer, addresses and payment
+                # come back as JSON sub-selects on the order row instead of
+                # four sequential follow-up queries
                 cur.execute("""
-                    SELECT * FROM addresses 
-                    WHERE user_id = %s 
-                    ORDER BY is_default DESC
-                """, (order['user_id'],))
-                addresses = cur.fetchall()
-                
-                customer_data = {
-                    'user': customer,
-                    'addresses': addresses
-                }
-            else:
-                customer_data = None
-            
-            # Get payment details
-            cur.execute("SELECT * FROM payments WHERE order_id = %s LIMIT 1", (order_id,))
-            payment = cur.fetchone()
-        
-        conn.close()
-        
+                    SELECT
+                        json_build_object(
+                            'order_id', o.order_id,
+                            'user_id', o.user_id,
+                            'user_name', o.user_name,
+                            'user_phone', o.user_phone,
+                            'user_email', o.user_email,
+                            'total_amount', o.total_amount,
+                            'payment_mode', o.payment_mode,
+                            'payment_status', o.payment_status,
+                            'delivery_location', o.delivery_location,
+                            'status', o.status,
+                            'order_date', o.order_date,
+                            'delivery_date', o.delivery_date
+                        ) as order_row,
+                        (SELECT COALESCE(json_agg(json_build_object(
+                            'order_item_id', oi.order_item_id,
+                            'item_id', oi.item_id,
+                            'item_type', oi.item_type,
+                            'item_name', oi.item_name,
+                            'item_photo_url', oi.item_photo_url,
+                            'full_description', oi.full_description,
+                            'quantity', oi.quantity,
+                            'price', oi.price,
+                            'total', oi.total
+                        ) ORDER BY oi.order_item_id), '[]'::json)
+                         FROM order_items oi WHERE oi.order_id = o.order_id) as items,
+                        (SELECT json_build_object(
+                            'id', u.id,
+                            'full_name', u.full_name,
+                            'phone', u.phone,
+                            'email', u.email,
+                            'profile_pic', u.profile_pic,
+                            'location', u.location,
+                            'is_active', u.is_active,
+                            'created_at', u.created_at,
+                            'last_login', u.last_login
+                        ) FROM users u
+                         WHERE u.id = o.user_id LIMIT 1) as customer,
+                        (SELECT COALESCE(json_agg(json_build_object(
+                            'full_name', a.full_name,
+                            'phone', a.phone,
+                            'address_line1', a.address_line1,
+                            'address_line2', a.address_line2,
+                            'landmark', a.landmark,
+                            'city', a.city,
+                            'state', a.state,
+                            'pincode', a.pincode,
+                            'latitude', a.latitude,
+                            'longitude', a.longitude,
+                            'is_default', a.is_default
+                        ) ORDER BY a.is_default DESC), '[]'::json)
+                         FROM addresses a WHERE a.user_id = o.user_id) as addresses,
+                        (SELECT json_build_object(
+                            'payment_id', p.payment_id,
+                            'user_name', p.user_name,
+                            'amount', p.amount,
+                            'payment_mode', p.payment_mode,
+                            'payment_status', p.payment_status,
+                            'payment_date', p.payment_date,
+                            'transaction_id', p.transaction_id,
+                            'razorpay_order_id', p.razorpay_order_id,
+                            'razorpay_payment_id', p.razorpay_payment_id,
+                            'razorpay_signature', p.razorpay_signature
+                        ) FROM payments p
+                         WHERE p.order_id = o.order_id LIMIT 1) as payment
+                    FROM orders o
+                    WHERE o.order_id = %s
+                """, (order_id,), prepare=True, binary=True)
+                row = cur.fetchone()
+
+        if not row:
+            return None
+
+        order = row['order_row']
+
+        if order.get('user_id'):
+            customer_data = {
+                'user': row['customer'],
+                'addresses': row['addresses']
+            }
+        else:
+            customer_data = None
+
         return {
             'order': order,
-            'items': items,
+            'items': row['items'],
             'customer': customer_data,
-            'payment': payment
+            'payment': row['payment']
         }
-        
+
     except Exception as e:
-        print(f"❌ Error getting order details: {e}")
+        logger.exception("Error getting order details")
         return None
 
 def get_customers(page=1, per_page=20, search=None):
     """Get all customers with pagination"""
     try:
-        conn = get_db_connection()
-        if not conn:
+        conn_ctx = get_db_connection()
+        if not conn_ctx:
             return [], 0
-        
+
         offset = (page - 1) * per_page
-        
-        query = """
-            SELECT 
-                u.*,
-                COUNT(o.order_id) as total_orders,
-                COALESCE(SUM(o.total_amount), 0) as total_spent,
-                MAX(o.order_date) as last_order_date
-            FROM users u
-            LEFT JOIN orders o ON u.id = o.user_id
-        """
-        
-        conditions = []
+
+        # total_orders / total_spent / last_order_date are maintained on
+        # users by a trigger at order-insert time (see init_admin_tables),
+        # so no join or GROUP BY over the customer's order history here
         params = []
-        
+        search_mode = None
+
         if search:
-            conditions.append("""
-                (u.full_name ILIKE %s OR 
-                 u.phone ILIKE %s OR 
-                 u.email ILIKE %s)
-            """)
+            search_mode = 'ilike'
             search_param = f"%{search}%"
             params.extend([search_param, search_param, search_param])
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += """
-            GROUP BY u.id
-            ORDER BY u.created_at DESC
-            LIMIT %s OFFSET %s
-        """
-        
+
+        query = _CUSTOMERS_LIST_QUERIES[search_mode]
         params.extend([per_page, offset])
-        
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            customers = cur.fetchall()
-            
-            # Get total count
-            count_query = "SELECT COUNT(*) as total FROM users"
-            if conditions:
-                count_query += " WHERE " + " AND ".join(conditions)
-                cur.execute(count_query, params[:-2])
-            else:
-                cur.execute(count_query)
-            
-            total = cur.fetchone()['total']
-        
-        conn.close()
+
+        with conn_ctx as conn:
+            with conn.cursor(name='customers_stream') as cur:
+                cur.itersize = 200
+                cur.execute(query, params)
+                customers = list(islice(cur, per_page))
+
+        total = _count_customers(search or '')
+
         return customers, total
-        
+
     except Exception as e:
-        print(f"❌ Error getting customers: {e}")
+        logger.exception("Error getting customers")
         return [], 0
 
+# IST date_trunc unit per statistics period; bucketing happens in SQL
+# so 'today' means the same calendar day as the dashboard's
+# CURRENT_DATE predicates rather than the worker's naive local time
+_STATS_TRUNC_UNITS = {'today': 'day', 'week': 'week', 'month': 'month'}
+
+def _get_order_statistics_from_views(trunc_unit):
+    """Read statistics from the precomputed daily materialized views.
+
+    The views (order_stats_daily / order_items_stats_daily, created in
+    models.init_admin_tables and re-refreshed by the _stats_refresher
+    daemon below) hold one row per day+status / day+item, so these
+    reads roll up a handful of buckets instead of scanning the orders
+    table. Returns None when the views are unavailable so the caller
+    can fall back to live queries.
+    """
+    try:
+        conn_ctx = get_db_connection()
+        if not conn_ctx:
+            return None
+
+        with conn_ctx as conn:
+            with conn.cursor() as cur:
+                # Totals: AVG composes from the bucket sums
+                cur.execute("""
+                    SELECT
+                        COALESCE(SUM(order_count), 0) as total_orders,
+                        COALESCE(SUM(total_revenue), 0) as total_revenue
+                    FROM order_stats_daily
+                    WHERE day >= DATE_TRUNC(%s, now() AT TIME ZONE 'Asia/Kolkata')
+                """, (trunc_unit,), prepare=True, binary=True)
+                sums = cur.fetchone()
+
+                cur.execute("""
+                    SELECT
+                        item_name,
+                        item_type,
+                        SUM(total_quantity) as total_quantity,
+                        SUM(total_revenue) as total_revenue
+                    FROM order_items_stats_daily
+                    WHERE day >= DATE_TRUNC(%s, now() AT TIME ZONE 'Asia/Kolkata')
+                    GROUP BY item_name, item_type
+                    ORDER BY total_quantity DESC
+                    LIMIT 10
+                """, (trunc_unit,), prepare=True, binary=True)
+                top_items = cur.fetchall()
+
+                cur.execute("""
+                    SELECT
+                        status,
+                        SUM(order_count) as count
+                    FROM order_stats_daily
+                    WHERE day >= DATE_TRUNC(%s, now() AT TIME ZONE 'Asia/Kolkata')
+                    GROUP BY status
+                """, (trunc_unit,), prepare=True, binary=True)
+                status_distribution = cur.fetchall()
+
+        total_orders = sums['total_orders'] if sums else 0
+        total_revenue = sums['total_revenue'] if sums else 0
+
+        return {
+            'totals': {
+                'total_orders': total_orders,
+                'total_revenue': total_revenue,
+                'avg_order_value': (total_revenue / total_orders) if total_orders else 0
+            },
+            'top_items': top_items,
+            'status_distribution': status_distribution
+        }
+
+    except Exception as e:
+        logger.warning("Stats views unavailable, falling back to live queries: %s", e)
+        return None
+
+# The views are only populated when they are created; without a
+# periodic REFRESH the statistics page freezes at deploy-time data
+# ('today' would read zeros from the next day on). This bounds their
+# staleness at the interval plus the 60s Redis cache.
+_STATS_REFRESH_SECONDS = int(os.environ.get('STATS_REFRESH_SECONDS', '300'))
+
+def _stats_refresher():
+    """Background thread: refresh the stats views on an interval.
+
+    Opens its own autocommit connection per cycle (REFRESH ...
+    CONCURRENTLY cannot run inside a transaction block, and holding a
+    pooled connection between refreshes would pin it).
+    """
+    import psycopg
+
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        return
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+
+    while True:
+        time.sleep(_STATS_REFRESH_SECONDS)
+        try:
+            with psycopg.connect(database_url, autocommit=True) as conn:
+                conn.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY order_stats_daily")
+                conn.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY order_items_stats_daily")
+        except Exception:
+            logger.exception("Stats view refresh failed")
+
+threading.Thread(target=_stats_refresher, daemon=True, name='stats-refresher').start()
+
+def _get_all_time_totals():
+    """Read all-time order totals from the trigger-maintained cache row.
+
+    Returns None when the cache table is missing so callers fall back
+    to the live aggregate.
+    """
+    try:
+        conn_ctx = get_db_connection()
+        if not conn_ctx:
+            return None
+
+        with conn_ctx as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT total_orders, total_revenue
+                    FROM order_totals_cache
+                    WHERE id = 1
+                """)
+                row = cur.fetchone()
+
+        if not row:
+            return None
+
+        total_orders = row['total_orders']
+        total_revenue = row['total_revenue']
+        return {
+            'total_orders': total_orders,
+            'total_revenue': total_revenue,
+            'avg_order_value': (total_revenue / total_orders) if total_orders else 0
+        }
+
+    except Exception as e:
+        logger.warning("Order totals cache unavailable: %s", e)
+        return None
+
+@cached('order_stats', ttl=60)
 def get_order_statistics(time_period='today'):
     """Get order statistics"""
     try:
-        conn = get_db_connection()
-        if not conn:
+        conn_ctx = get_db_connection()
+        if not conn_ctx:
             return {
                 'totals': {'total_orders': 0, 'total_revenue': 0, 'avg_order_value': 0},
                 'top_items': [],
                 'status_distribution': []
             }
-        
-        # Calculate date range
-        now = datetime.now()
-        
-        if time_period == 'today':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = now
-        elif time_period == 'week':
-            start_date = now - timedelta(days=7)
-            end_date = now
-        elif time_period == 'month':
-            start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            end_date = now
-        else:  # all time
-            start_date = datetime.min
-            end_date = now
-        
-        with conn.cursor() as cur:
-            # Total statistics
-            cur.execute("""
-                SELECT 
-                    COUNT(*) as total_orders,
-                    COALESCE(SUM(total_amount), 0) as total_revenue,
-                    COALESCE(AVG(total_amount), 0) as avg_order_value
-                FROM orders
-                WHERE order_date BETWEEN %s AND %s
-            """, (start_date, end_date))
-            totals = cur.fetchone()
-            
-            # Most ordered items
-            cur.execute("""
-                SELECT 
-                    oi.item_name,
-                    oi.item_type,
-                    SUM(oi.quantity) as total_quantity,
-                    SUM(oi.total) as total_revenue
-                FROM order_items oi
-                JOIN orders o ON oi.order_id = o.order_id
-                WHERE o.order_date BETWEEN %s AND %s
-                GROUP BY oi.item_name, oi.item_type
-                ORDER BY total_quantity DESC
-                LIMIT 10
-            """, (start_date, end_date))
-            top_items = cur.fetchall()
-            
-            # Orders by status
-            cur.execute("""
-                SELECT 
-                    status,
-                    COUNT(*) as count
-                FROM orders
-                WHERE order_date BETWEEN %s AND %s
-                GROUP BY status
-            """, (start_date, end_date))
-            status_distribution = cur.fetchall()
-        
-        conn.close()
-        
+
+        # All-time totals come from a single trigger-maintained cache row
+        # (see init_admin_tables) instead of scanning the whole table
+        if time_period == 'all':
+            totals = _get_all_time_totals()
+            if totals is not None:
+                with conn_ctx as conn:
+                    with conn.cursor() as cur:
+                        cur.execute("""
+                            SELECT 
+                                oi.item_name,
+                                oi.item_type,
+                                SUM(oi.quantity) as total_quantity,
+                                SUM(oi.total) as total_revenue
+                            FROM order_items oi
+                            GROUP BY oi.item_name, oi.item_type
+                            ORDER BY total_quantity DESC
+                            LIMIT 10
+                        """)
+                        top_items = cur.fetchall()
+
+                        cur.execute("""
+                            SELECT 
+                                status,
+                                COUNT(*) as count
+                            FROM orders
+                            GROUP BY status
+                        """)
+                        status_distribution = cur.fetchall()
+
+                return {
+                    'totals': totals,
+                    'top_items': top_items or [],
+                    'status_distribution': status_distribution or []
+                }
+
+        # Bucket boundaries are computed by Postgres in IST, matching the
+        # dashboard's CURRENT_DATE predicates; Python no longer mixes its
+        # naive local datetime.now() into the range. 'all' falls through
+        # here only when the totals cache is missing, so it scans the
+        # epoch-to-now range the old code used.
+        trunc_unit = _STATS_TRUNC_UNITS.get(time_period, 'millennium')
+
+        # Serve from the materialized views when possible
+        stats = _get_order_statistics_from_views(trunc_unit)
+        if stats is not None:
+            return stats
+
+        with conn_ctx as conn:
+            with conn.cursor() as cur:
+                # Total statistics
+                cur.execute("""
+                    SELECT 
+                        COUNT(*) as total_orders,
+                        COALESCE(SUM(total_amount), 0) as total_revenue,
+                        COALESCE(AVG(total_amount), 0) as avg_order_value
+                    FROM orders
+                    WHERE order_date >= DATE_TRUNC(%s, now() AT TIME ZONE 'Asia/Kolkata')
+                """, (trunc_unit,))
+                totals = cur.fetchone()
+
+                # Most ordered items
+                cur.execute("""
+                    SELECT 
+                        oi.item_name,
+                        oi.item_type,
+                        SUM(oi.quantity) as total_quantity,
+                        SUM(oi.total) as total_revenue
+                    FROM order_items oi
+                    JOIN orders o ON oi.order_id = o.order_id
+                    WHERE o.order_date >= DATE_TRUNC(%s, now() AT TIME ZONE 'Asia/Kolkata')
+                    GROUP BY oi.item_name, oi.item_type
+                    ORDER BY total_quantity DESC
+                    LIMIT 10
+                """, (trunc_unit,))
+                top_items = cur.fetchall()
+
+                # Orders by status
+                cur.execute("""
+                    SELECT 
+                        status,
+                        COUNT(*) as count
+                    FROM orders
+                    WHERE order_date >= DATE_TRUNC(%s, now() AT TIME ZONE 'Asia/Kolkata')
+                    GROUP BY status
+                """, (trunc_unit,))
+                status_distribution = cur.fetchall()
+
         return {
             'totals': totals or {'total_orders': 0, 'total_revenue': 0, 'avg_order_value': 0},
             'top_items': top_items or [],
@@ -386,7 +892,7 @@ def get_order_statistics(time_period='today'):
         }
         
     except Exception as e:
-        print(f"❌ Error getting statistics: {e}")
+        logger.exception("Error getting statistics")
         return {
             'totals': {'total_orders': 0, 'total_revenue': 0, 'avg_order_value': 0},
             'top_items': [],
@@ -436,11 +942,7 @@ def admin_login():
             flash('Username and password are required', 'error')
             return render_template('admin_login.html')
         
-        # Check admin credentials
-        correct_username = os.environ.get('ADMIN_USERNAME', 'admin')
-        correct_password = os.environ.get('ADMIN_PASSWORD', 'admin123')
-        
-        if username == correct_username and password == correct_password:
+        if _check_admin_credentials(username, password):
             session['admin_logged_in'] = True
             session['admin_username'] = username
             session['login_time'] = ist_now().isoformat()
@@ -464,71 +966,79 @@ def admin_logout():
 # ✅ DASHBOARD ROUTES
 # ============================================
 
-@app.route('/admin/dashboard')
-@admin_login_required
-def admin_dashboard():
-    """Admin Dashboard with Today's Orders"""
-    try:
-        # Get today's orders
-        todays_orders = get_todays_orders()
-        
-        # Get statistics
-        stats = get_order_statistics('today')
-        
-        # Get quick stats
-        today_stats = {'total_orders': 0, 'total_revenue': 0, 'avg_order_value': 0}
-        pending_stats = {'pending': 0}
-        customer_stats = {'new_customers': 0}
-        
-        conn = get_db_connection()
-        if conn:
+def _get_dashboard_counts():
+    """Quick dashboard counters (today's stats, pending, new customers)"""
+    today_stats = {'total_orders': 0, 'total_revenue': 0, 'avg_order_value': 0}
+    pending_stats = {'pending': 0}
+    customer_stats = {'new_customers': 0}
+
+    conn_ctx = get_db_connection()
+    if conn_ctx:
+        with conn_ctx as conn:
             with conn.cursor() as cur:
-                # Today's stats
+                # Today's stats + pending count in one pass over orders
+                # via conditional aggregation (one round-trip, not three)
                 cur.execute("""
-                    SELECT 
-                        COUNT(*) as total_orders,
-                        COALESCE(SUM(total_amount), 0) as total_revenue,
-                        COALESCE(AVG(total_amount), 0) as avg_order_value
+                    SELECT
+                        COUNT(*) FILTER (WHERE order_date >= CURRENT_DATE
+                                         AND order_date < CURRENT_DATE + INTERVAL '1 day') as total_orders,
+                        COALESCE(SUM(total_amount) FILTER (WHERE order_date >= CURRENT_DATE
+                                                           AND order_date < CURRENT_DATE + INTERVAL '1 day'), 0) as total_revenue,
+                        COALESCE(AVG(total_amount) FILTER (WHERE order_date >= CURRENT_DATE
+                                                           AND order_date < CURRENT_DATE + INTERVAL '1 day'), 0) as avg_order_value,
+                        COUNT(*) FILTER (WHERE status = 'pending') as pending
                     FROM orders
-                    WHERE DATE(order_date) = CURRENT_DATE
-                """)
-                today_stats = cur.fetchone() or today_stats
-                
-                # Pending orders
-                cur.execute("SELECT COUNT(*) as pending FROM orders WHERE status = 'pending'")
-                pending_stats = cur.fetchone() or pending_stats
-                
+                """, prepare=True, binary=True)
+                order_stats = cur.fetchone()
+
+                if order_stats:
+                    today_stats = order_stats
+                    pending_stats = {'pending': order_stats['pending']}
+
                 # New customers today
                 cur.execute("""
-                    SELECT COUNT(*) as new_customers 
-                    FROM users 
-                    WHERE DATE(created_at) = CURRENT_DATE
-                """)
+                    SELECT COUNT(*) as new_customers
+                    FROM users
+                    WHERE created_at >= CURRENT_DATE
+                      AND created_at < CURRENT_DATE + INTERVAL '1 day'
+                """, prepare=True, binary=True)
                 customer_stats = cur.fetchone() or customer_stats
-            
-            conn.close()
-        
+
+    return today_stats, pending_stats, customer_stats
+
+@app.route('/admin/dashboard')
+@admin_login_required
+def admin_dashboard():
+    """Admin Dashboard with Today's Orders"""
+    try:
+        # The three dashboard sections are independent, so they run
+        # concurrently on separate pooled connections; page wall-clock
+        # becomes the max of the sub-queries instead of their sum
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            f_orders = executor.submit(get_todays_orders)
+            f_stats = executor.submit(get_order_statistics, 'today')
+            f_counts = executor.submit(_get_dashboard_counts)
+
+            todays_orders = f_orders.result()
+            stats = f_stats.result()
+            today_stats, pending_stats, customer_stats = f_counts.result()
+
         return render_template('dashboard.html',
                              todays_orders=todays_orders,
                              today_stats=today_stats,
                              pending_stats=pending_stats,
                              customer_stats=customer_stats,
-                             stats=stats,
-                             format_currency=format_currency,
-                             format_ist_datetime=format_ist_datetime)
+                             stats=stats)
         
     except Exception as e:
-        print(f"❌ Dashboard error: {e}")
-        traceback.print_exc()
+        logger.exception("Dashboard error")
         flash('Error loading dashboard', 'error')
         return render_template('dashboard.html',
                              todays_orders=[],
                              today_stats={'total_orders': 0, 'total_revenue': 0, 'avg_order_value': 0},
                              pending_stats={'pending': 0},
                              customer_stats={'new_customers': 0},
-                             stats={'totals': {'total_orders': 0, 'total_revenue': 0, 'avg_order_value': 0}},
-                             format_currency=format_currency,
-                             format_ist_datetime=format_ist_datetime)
+                             stats={'totals': {'total_orders': 0, 'total_revenue': 0, 'avg_order_value': 0}})
 
 # ============================================
 # ✅ ORDERS MANAGEMENT ROUTES
@@ -555,12 +1065,10 @@ def admin_orders():
                              total_pages=total_pages,
                              total=total,
                              current_status=status,
-                             current_search=search,
-                             format_currency=format_currency,
-                             format_ist_datetime=format_ist_datetime)
+                             current_search=search)
         
     except Exception as e:
-        print(f"❌ Orders page error: {e}")
+        logger.exception("Orders page error")
         flash('Error loading orders', 'error')
         return render_template('orders.html',
                              orders=[],
@@ -568,9 +1076,7 @@ def admin_orders():
                              total_pages=0,
                              total=0,
                              current_status='',
-                             current_search='',
-                             format_currency=format_currency,
-                             format_ist_datetime=format_ist_datetime)
+                             current_search='')
 
 @app.route('/admin/order/<int:order_id>')
 @admin_login_required
@@ -588,10 +1094,16 @@ def admin_order_details(order_id):
                 order_data['order']['order_date']
             )
         
-        # Format currency
-        for item in order_data['items']:
-            item['price_formatted'] = format_currency(item.get('price', 0))
-            item['total_formatted'] = format_currency(item.get('total', 0))
+        # Format currency: build the augmented rows in one shot rather
+        # than growing each item dict in place
+        order_data['items'] = [
+            {
+                **item,
+                'price_formatted': format_currency(item.get('price', 0)),
+                'total_formatted': format_currency(item.get('total', 0))
+            }
+            for item in order_data['items']
+        ]
         
         order_data['order']['total_amount_formatted'] = format_currency(
             order_data['order'].get('total_amount', 0)
@@ -606,7 +1118,7 @@ def admin_order_details(order_id):
         })
         
     except Exception as e:
-        print(f"❌ Order details error: {e}")
+        logger.exception("Order details error")
         return jsonify({'success': False, 'message': str(e)})
 
 # ============================================
@@ -627,35 +1139,22 @@ def admin_customers():
         per_page = 20
         total_pages = (total + per_page - 1) // per_page if total > 0 else 1
         
-        # Format dates and currency
-        for customer in customers:
-            if customer.get('created_at'):
-                customer['created_at_formatted'] = format_ist_datetime(customer['created_at'])
-            
-            if customer.get('last_order_date'):
-                customer['last_order_date_formatted'] = format_ist_datetime(customer['last_order_date'])
-            
-            if customer.get('total_spent'):
-                customer['total_spent_formatted'] = format_currency(customer['total_spent'])
-        
         return render_template('customers.html',
                              customers=customers,
                              page=page,
                              total_pages=total_pages,
                              total=total,
-                             current_search=search,
-                             format_ist_datetime=format_ist_datetime)
+                             current_search=search)
         
     except Exception as e:
-        print(f"❌ Customers page error: {e}")
+        logger.exception("Customers page error")
         flash('Error loading customers', 'error')
         return render_template('customers.html',
                              customers=[],
                              page=1,
                              total_pages=0,
                              total=0,
-                             current_search='',
-                             format_ist_datetime=format_ist_datetime)
+                             current_search='')
 
 # ============================================
 # ✅ STATISTICS ROUTES
@@ -682,31 +1181,69 @@ def admin_statistics():
         
         return render_template('statistics.html',
                              stats=stats,
-                             time_period=time_period,
-                             format_currency=format_currency)
+                             time_period=time_period)
         
     except Exception as e:
-        print(f"❌ Statistics page error: {e}")
+        logger.exception("Statistics page error")
         flash('Error loading statistics', 'error')
         return render_template('statistics.html',
                              stats={'totals': {'total_orders': 0, 'total_revenue': 0, 'avg_order_value': 0}},
-                             time_period='today',
-                             format_currency=format_currency)
+                             time_period='today')
+
+# ============================================
+# ✅ UPLOAD STATUS ROUTE
+# ============================================
+
+@app.route('/admin/upload_status/<path:public_id>')
+@admin_login_required
+def admin_upload_status(public_id):
+    """Poll status of a background Cloudinary upload"""
+    try:
+        from models import get_upload_status
+        return jsonify({'success': True, **get_upload_status(public_id)})
+    except Exception as e:
+        logger.exception("Upload status error")
+        return jsonify({'success': False, 'message': str(e)})
 
 # ============================================
 # ✅ HEALTH CHECK ROUTE
 # ============================================
 
+# Last (monotonic timestamp, status) from the health probe; aggressive
+# load-balancer polling reuses it instead of checking out a connection
+# per hit
+_db_probe = (0.0, 'unknown')
+_DB_PROBE_TTL = 10
+
+def _probe_database():
+    """Return the database status, re-probing at most every TTL seconds"""
+    global _db_probe
+
+    checked_at, status = _db_probe
+    now = time.monotonic()
+
+    if now - checked_at < _DB_PROBE_TTL:
+        return status
+
+    try:
+        conn_ctx = get_db_connection()
+        if conn_ctx:
+            with conn_ctx as conn:
+                status = 'connected'
+        else:
+            status = 'disconnected'
+    except Exception:
+        status = 'disconnected'
+
+    _db_probe = (now, status)
+    return status
+
 @app.route('/admin/health')
 def admin_health():
     """Health check endpoint"""
     try:
-        conn = get_db_connection()
-        db_status = 'connected' if conn else 'disconnected'
-        
-        if conn:
-            conn.close()
-        
+        db_status = _probe_database()
+
         return jsonify({
             'status': 'healthy',
             'service': 'Bite Me Buddy Admin',
@@ -754,36 +1291,36 @@ def utility_processor():
         }
         return status_classes.get(status.lower() if status else '', 'secondary')
     
+    @cached('admin_stats', ttl=60)
     def get_admin_stats():
         try:
-            conn = get_db_connection()
-            if not conn:
+            conn_ctx = get_db_connection()
+            if not conn_ctx:
                 return {
                     'total_orders': 0,
                     'total_revenue': '₹0.00',
                     'total_customers': 0,
                     'pending_orders': 0
                 }
-            
-            with conn.cursor() as cur:
-                # Total orders
-                cur.execute("SELECT COUNT(*) as total FROM orders")
-                total_orders = cur.fetchone()['total']
-                
-                # Total revenue
-                cur.execute("SELECT COALESCE(SUM(total_amount), 0) as total FROM orders")
-                total_revenue = cur.fetchone()['total']
-                
-                # Total customers
-                cur.execute("SELECT COUNT(*) as total FROM users")
-                total_customers = cur.fetchone()['total']
-                
-                # Pending orders
-                cur.execute("SELECT COUNT(*) as total FROM orders WHERE status = 'pending'")
-                pending_orders = cur.fetchone()['total']
-            
-            conn.close()
-            
+
+            with conn_ctx as conn:
+                with conn.cursor() as cur:
+                    # Total orders
+                    cur.execute("SELECT COUNT(*) as total FROM orders")
+                    total_orders = cur.fetchone()['total']
+
+                    # Total revenue
+                    cur.execute("SELECT COALESCE(SUM(total_amount), 0) as total FROM orders")
+                    total_revenue = cur.fetchone()['total']
+
+                    # Total customers
+                    cur.execute("SELECT COUNT(*) as total FROM users")
+                    total_customers = cur.fetchone()['total']
+
+                    # Pending orders
+                    cur.execute("SELECT COUNT(*) as total FROM orders WHERE status = 'pending'")
+                    pending_orders = cur.fetchone()['total']
+
             return {
                 'total_orders': total_orders,
                 'total_revenue': format_currency(total_revenue),
@@ -791,7 +1328,7 @@ def utility_processor():
                 'pending_orders': pending_orders
             }
         except Exception as e:
-            print(f"⚠️ Stats error: {e}")
+            logger.exception("Stats error")
             return {
                 'total_orders': 0,
                 'total_revenue': '₹0.00',
@@ -799,10 +1336,8 @@ def utility_processor():
                 'pending_orders': 0
             }
     
+    # formatters live in jinja_env.globals now (registered at app init)
     return dict(
-        ist_now=ist_now,
-        format_ist_datetime=format_ist_datetime,
-        format_currency=format_currency,
         get_admin_stats=get_admin_stats,
         get_status_badge=get_status_badge,
         get_payment_badge=get_payment_badge
@@ -52,6 +52,12 @@ def to_ist(datetime_obj):
 
 def format_ist_datetime(datetime_obj, format_str="%d %b %Y, %I:%M %p"):
     """Format datetime in IST with Indian 12-hour AM/PM format"""
+    if isinstance(datetime_obj, str):
+        # ISO 8601 strings (e.g. timestamps coming back through JSON)
+        try:
+            datetime_obj = datetime.fromisoformat(datetime_obj)
+        except ValueError:
+            return datetime_obj
     try:
         ist_time = to_ist(datetime_obj)
         if ist_time:
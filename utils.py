@@ -1,163 +1,361 @@
 # utils.py - Utility Functions
+import functools
 import json
+import sys
+from itertools import islice
+from operator import itemgetter
+import logging
 from datetime import datetime, timedelta
-import traceback
+
+class _DedupeFilter(logging.Filter):
+    """Drop log records repeating the same message within a window.
+
+    Keeps an error storm (e.g. a Cloudinary outage failing every image
+    lookup) to one line per message every 10 seconds instead of one
+    per request.
+    """
+
+    def __init__(self, window=10.0):
+        super().__init__()
+        self.window = window
+        self._last_seen = {}
+
+    def filter(self, record):
+        import time
+        now = time.monotonic()
+        key = (record.levelno, record.msg)
+        last = self._last_seen.get(key)
+        if last is not None and now - last < self.window:
+            return False
+        self._last_seen[key] = now
+        return True
+
+logger = logging.getLogger('admin.utils')
+logger.addFilter(_DedupeFilter())
 
 try:
     from config import ist_now, format_ist_datetime
-    import cloudinary
-    import cloudinary.api
 except ImportError:
     print("⚠️ Some imports failed in utils.py")
 
+# The cloudinary SDK drags in requests/urllib3 and costs tens of
+# milliseconds of worker cold start, so it loads on first use instead
+# of at import (most request paths never touch it)
+_cloudinary = None
+
+def _get_cloudinary():
+    """Import and return the cloudinary module on first use"""
+    global _cloudinary
+    if _cloudinary is None:
+        import cloudinary
+        import cloudinary.api
+        import cloudinary.search
+        _cloudinary = cloudinary
+    return _cloudinary
+
+# NumPy vectorizes the numeric chart columns; charts still work
+# (loop fallback) when it isn't installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# orjson serializes the chart payload in C; stdlib json fills in when
+# it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _column_f64(rows, key):
+    """Extract a float column from row dicts in one C-level pass"""
+    arr = np.fromiter(
+        (row.get(key, 0) or 0 for row in rows),
+        dtype=np.float64, count=len(rows)
+    )
+    # any NaN/inf that sneaks through bad data becomes 0.0 in C
+    return np.nan_to_num(arr, posinf=0.0, neginf=0.0).tolist()
+
+def _column_i64(rows, key):
+    """Extract an int column from row dicts in one C-level pass"""
+    return np.fromiter(
+        (row.get(key, 0) or 0 for row in rows),
+        dtype=np.int64, count=len(rows)
+    ).tolist()
+
+def _safe_float(value):
+    """float() that treats None/garbage as 0.0"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+# Chart colors per order status, hoisted so prepare_chart_data doesn't
+# rebuild the dict on every call. Keys are interned so lookups with
+# the repeated status strings coming off the DB hit CPython's
+# pointer-equality fast path before any full string compare.
+STATUS_COLORS = {sys.intern(k): v for k, v in {
+    'pending': '#ffc107',
+    'confirmed': '#17a2b8',
+    'processing': '#007bff',
+    'shipped': '#6f42c1',
+    'delivered': '#28a745',
+    'cancelled': '#dc3545'
+}.items()}
+DEFAULT_STATUS_COLOR = '#6c757d'
+
+# Timeline axis label format, hoisted so the per-row strftime calls
+# share one spec string
+_TIMELINE_LABEL_FMT = "%d %b %I:%M %p"
+
+# Fused C-level extraction of the status-row fields (one call instead
+# of two dict lookups per row)
+_status_fields = itemgetter('status', 'count')
+
+def _trunc(s, n=20, _e='...'):
+    """Truncate a label to n chars with an ellipsis"""
+    return s if len(s) <= n else s[:n] + _e
+
+# Bound .format so per-row link building is one C call instead of
+# f-string assembly
+_map_fmt = "https://www.google.com/maps?q={},{}".format
+
 def generate_map_link(latitude, longitude):
     """Generate Google Maps link from coordinates"""
-    try:
-        if latitude and longitude:
-            return f"https://www.google.com/maps?q={latitude},{longitude}"
-    except:
-        pass
+    if latitude and longitude:
+        return _map_fmt(latitude, longitude)
     return None
 
-def format_currency(amount):
+def format_currency(amount, _f=format):
     """Format currency amount"""
+    # _f=format binds the builtin as a local (LOAD_FAST) and skips
+    # per-call f-string format-spec parsing on big order tables
     try:
-        if amount is None:
-            return "₹0.00"
-        amount_float = float(amount)
-        return f"₹{amount_float:,.2f}"
-    except:
+        return '₹' + _f(float(amount or 0), ',.2f')
+    except (TypeError, ValueError):
         return "₹0.00"
 
+DEFAULT_IMAGE_URL = "https://res.cloudinary.com/demo/image/upload/v1633427556/default_image.jpg"
+
+# Folder listings from the Cloudinary search API, cached per folder as
+# (fetched_at, resources) so image renders don't repeat the HTTPS
+# round-trip for five minutes. Each folder also gets two hash indexes
+# ({public_id: secure_url} and the same keyed by the id's last path
+# segment) so lookups are O(1) instead of a substring scan per render.
+_folder_cache = {}
+_folder_index = {}
+_folder_suffix_index = {}
+_FOLDER_CACHE_TTL = 300
+
+def _index_folder(folder, resources):
+    """Build the per-folder lookup indexes"""
+    _folder_index[folder] = {r['public_id']: r['secure_url'] for r in resources}
+    _folder_suffix_index[folder] = {
+        r['public_id'].rsplit('/', 1)[-1]: r['secure_url'] for r in resources
+    }
+
+def _get_folder_resources(folder):
+    """List a Cloudinary folder's resources, cached for the TTL"""
+    import time
+
+    cached = _folder_cache.get(folder)
+    if cached and time.monotonic() - cached[0] < _FOLDER_CACHE_TTL:
+        return cached[1]
+
+    try:
+        result = _get_cloudinary().Search() \
+            .expression(f"folder:{folder}") \
+            .sort_by('public_id', 'desc') \
+            .max_results(500) \
+            .execute()
+        resources = result.get('resources', [])
+    except Exception as e:
+        logger.warning("Cloudinary folder search error: %s", e)
+        return cached[1] if cached else []
+
+    _folder_cache[folder] = (time.monotonic(), resources)
+    _index_folder(folder, resources)
+    return resources
+
 def get_cloudinary_image_url(public_id, folder=None):
     """Get Cloudinary image URL"""
     try:
-        if not public_id or not public_id.startswith('http'):
-            # Return default image
-            return "https://res.cloudinary.com/demo/image/upload/v1633427556/default_image.jpg"
-        
-        return public_id
+        if public_id and public_id.startswith('http'):
+            return public_id
+
+        if public_id and folder:
+            resources = _get_folder_resources(folder)
+
+            # Exact or last-segment hit via the hash indexes
+            url = (_folder_index.get(folder, {}).get(public_id) or
+                   _folder_suffix_index.get(folder, {}).get(public_id))
+            if url:
+                return url
+
+            # Mid-string matches still fall back to the linear scan
+            for resource in resources:
+                if public_id in resource['public_id']:
+                    return resource['secure_url']
+
+        # Return default image
+        return DEFAULT_IMAGE_URL
     except Exception as e:
-        print(f"⚠️ Cloudinary error: {e}")
-        return "https://res.cloudinary.com/demo/image/upload/v1633427556/default_image.jpg"
+        logger.warning("Cloudinary error: %s", e)
+        return DEFAULT_IMAGE_URL
+
+def _midnight(dt):
+    """Start of dt's day, built positionally (cheaper than .replace kwargs)"""
+    return datetime(dt.year, dt.month, dt.day, tzinfo=dt.tzinfo)
+
+def _end_of_day(dt):
+    """Last microsecond of dt's day"""
+    return datetime(dt.year, dt.month, dt.day, 23, 59, 59, 999999, tzinfo=dt.tzinfo)
+
+def _last_month_dates(now):
+    last_day = now.replace(day=1) - timedelta(days=1)
+    return _midnight(last_day.replace(day=1)), _end_of_day(last_day)
+
+# Period name -> range function; dispatch is one dict lookup instead
+# of walking an if/elif chain of string compares
+_PERIOD_DISPATCH = {
+    'today': lambda now: (_midnight(now), now),
+    'yesterday': lambda now: (_midnight(now - timedelta(days=1)),
+                              _end_of_day(now - timedelta(days=1))),
+    'week': lambda now: (now - timedelta(days=7), now),
+    'month': lambda now: (_midnight(now.replace(day=1)), now),
+    'last_month': _last_month_dates,
+}
+_PERIOD_ALL_TIME = lambda now: (datetime.min, now)
+
+@functools.lru_cache(maxsize=16)
+def _compute_period_dates(period, now):
+    """Resolve a period name to (start, end); now is minute-truncated
+    so repeated calls within the same minute hit the cache"""
+    return _PERIOD_DISPATCH.get(period, _PERIOD_ALL_TIME)(now)
+
+def _now_cached():
+    """Current IST time, computed once per Flask request.
+
+    Dashboards call into the date helpers from several widgets per
+    render; caching on flask.g collapses those to one ist_now() (and
+    one pytz conversion). Falls back to a direct call outside a
+    request context.
+    """
+    try:
+        from flask import g
+        if not hasattr(g, '_ist_now'):
+            g._ist_now = ist_now()
+        return g._ist_now
+    except (ImportError, RuntimeError):
+        return ist_now()
 
 def get_time_period_dates(period):
     """Get start and end dates for time period"""
     try:
-        now = ist_now()
-        
-        if period == 'today':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = now
-        elif period == 'yesterday':
-            start_date = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = (now - timedelta(days=1)).replace(hour=23, minute=59, second=59, microsecond=999999)
-        elif period == 'week':
-            start_date = now - timedelta(days=7)
-            end_date = now
-        elif period == 'month':
-            start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            end_date = now
-        elif period == 'last_month':
-            first_day_last_month = (now.replace(day=1) - timedelta(days=1)).replace(day=1)
-            last_day_last_month = now.replace(day=1) - timedelta(days=1)
-            start_date = first_day_last_month.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = last_day_last_month.replace(hour=23, minute=59, second=59, microsecond=999999)
-        else:  # all time
-            start_date = datetime.min
-            end_date = now
-        
-        return start_date, end_date
-    except:
+        now = _now_cached()
+        return _compute_period_dates(period, now.replace(second=0, microsecond=0))
+    except (AttributeError, TypeError, ValueError):
         return datetime.min, datetime.now()
 
+def _numeric_columns(rows, int_key, float_key):
+    """Extract the (ints, floats) columns for a chart, vectorized when
+    NumPy is available and falling back to safe per-row coercion when
+    the data defeats the C pass"""
+    if np is not None:
+        try:
+            return _column_i64(rows, int_key), _column_f64(rows, float_key)
+        except (TypeError, ValueError, OverflowError):
+            logger.exception("Vectorized chart column extraction failed")
+    return ([int(row.get(int_key, 0) or 0) for row in rows],
+            [_safe_float(row.get(float_key)) for row in rows])
+
 def prepare_chart_data(orders_data, top_items, status_data):
-    """Prepare data for Chart.js charts - RETURNS SIMPLE DICT"""
+    """Prepare data for Chart.js charts - RETURNS SIMPLE DICT
+
+    Only the risky conversions (strftime, numeric coercion) are
+    guarded; unexpected errors propagate to the route's handler
+    instead of being swallowed behind an empty chart.
+    """
+    # Only the rendered points get processed: the charts show at
+    # most 20 timeline buckets and 10 items, so cap up front. islice
+    # also accepts generators (e.g. a streaming cursor) without
+    # materializing the full result first.
+    orders_data = list(islice(orders_data, 20))
+    top_items = list(islice(top_items, 10))
+
+    # Orders timeline chart
     try:
-        # Orders timeline chart
-        timeline_labels = []
-        timeline_values = []
-        revenue_values = []
-        
-        for item in orders_data:
-            period = item.get('period')
-            if isinstance(period, datetime):
-                # Use simple formatting without function calls
-                timeline_labels.append(period.strftime("%d %b %I:%M %p"))
-            else:
-                timeline_labels.append(str(period))
-            
-            timeline_values.append(item.get('order_count', 0))
-            revenue_values.append(float(item.get('total_revenue', 0) or 0))
-        
-        # Limit data points
-        if len(timeline_labels) > 20:
-            timeline_labels = timeline_labels[:20]
-            timeline_values = timeline_values[:20]
-            revenue_values = revenue_values[:20]
-        
-        timeline_chart = {
-            'labels': timeline_labels,
-            'orders': timeline_values,
-            'revenue': revenue_values
-        }
-        
-        # Top items chart
-        item_labels = []
-        item_quantities = []
-        item_revenues = []
-        
-        for item in top_items:
-            name = item.get('item_name', 'Unknown')
-            item_labels.append(name[:20] + ('...' if len(name) > 20 else ''))
-            item_quantities.append(item.get('total_quantity', 0))
-            item_revenues.append(float(item.get('total_revenue', 0) or 0))
-        
-        # Limit to 10 items
-        if len(item_labels) > 10:
-            item_labels = item_labels[:10]
-            item_quantities = item_quantities[:10]
-            item_revenues = item_revenues[:10]
-        
-        items_chart = {
-            'labels': item_labels,
-            'quantities': item_quantities,
-            'revenues': item_revenues
-        }
-        
-        # Status distribution chart
-        status_labels = []
-        status_values = []
-        status_colors = {
-            'pending': '#ffc107',
-            'confirmed': '#17a2b8',
-            'processing': '#007bff',
-            'shipped': '#6f42c1',
-            'delivered': '#28a745',
-            'cancelled': '#dc3545'
-        }
-        
-        for item in status_data:
-            status = item.get('status', 'unknown')
-            status_labels.append(status.title())
-            status_values.append(item.get('count', 0))
-        
-        status_chart = {
-            'labels': status_labels,
-            'values': status_values,
-            'colors': [status_colors.get(label.lower(), '#6c757d') for label in status_labels]
-        }
-        
-        return {
-            'timeline': timeline_chart,
-            'items': items_chart,
-            'status': status_chart
-        }
-    except Exception as e:
-        print(f"⚠️ Chart data error: {e}")
-        traceback.print_exc()
-        return {
-            'timeline': {'labels': [], 'orders': [], 'revenue': []},
-            'items': {'labels': [], 'quantities': [], 'revenues': []},
-            'status': {'labels': [], 'values': [], 'colors': []}
-        }
\ No newline at end of file
+        timeline_labels = [
+            p.strftime(_TIMELINE_LABEL_FMT) if isinstance(p := item.get('period'), datetime)
+            else str(p)
+            for item in orders_data
+        ]
+    except ValueError:
+        logger.exception("Bad timeline period data")
+        timeline_labels = [str(item.get('period')) for item in orders_data]
+
+    # Numeric columns coerce in one C-level pass instead of a
+    # float() call per row
+    timeline_values, revenue_values = _numeric_columns(
+        orders_data, 'order_count', 'total_revenue')
+
+    timeline_chart = {
+        'labels': timeline_labels,
+        'orders': timeline_values,
+        'revenue': revenue_values
+    }
+
+    # Top items chart
+    item_labels = [_trunc(item.get('item_name', 'Unknown')) for item in top_items]
+
+    item_quantities, item_revenues = _numeric_columns(
+        top_items, 'total_quantity', 'total_revenue')
+
+    items_chart = {
+        'labels': item_labels,
+        'quantities': item_quantities,
+        'revenues': item_revenues
+    }
+
+    # Status distribution chart: labels, values and colors in one
+    # pass over the raw status strings
+    status_labels = []
+    status_values = []
+    status_colors = []
+
+    for item in status_data:
+        try:
+            status, count = _status_fields(item)
+        except KeyError:
+            status, count = item.get('status'), item.get('count', 0)
+        # a present-but-NULL status would blow up .title(); treat any
+        # falsy value as unknown
+        if not status:
+            status = 'unknown'
+        status_labels.append(status.title())
+        status_values.append(count)
+        status_colors.append(STATUS_COLORS.get(status, DEFAULT_STATUS_COLOR))
+
+    status_chart = {
+        'labels': status_labels,
+        'values': status_values,
+        'colors': status_colors
+    }
+
+    return {
+        'timeline': timeline_chart,
+        'items': items_chart,
+        'status': status_chart
+    }
+
+def prepare_chart_data_json(orders_data, top_items, status_data):
+    """prepare_chart_data, serialized straight to JSON bytes.
+
+    Lets a view hand Flask a ready application/json body
+    (Response(..., mimetype='application/json')) without a second
+    pass through jsonify.
+    """
+    charts = prepare_chart_data(orders_data, top_items, status_data)
+    if orjson is not None:
+        return orjson.dumps(charts, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(charts, default=str).encode('utf-8')
\ No newline at end of file